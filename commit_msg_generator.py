@@ -1,8 +1,33 @@
+import hashlib
+import json
+import os
 import subprocess
-from typing import Dict
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional
 
 import openai
 
+COMMIT_MARKER = "\x1e"
+COMMIT_SUMMARIES_FILENAME = "commit_summaries.json"
+MAX_COMMIT_CHANGES_CHARACTERS = 12000
+MAX_WORKERS = 8
+REQUESTS_PER_MINUTE = 60
+
+CHANGELOG_CATEGORIES = ["feature", "fix", "performance", "refactor", "docs", "test", "chore", "other"]
+CHANGELOG_TITLES = {
+    "feature": "Features",
+    "fix": "Fixes",
+    "performance": "Performance",
+    "refactor": "Refactoring",
+    "docs": "Documentation",
+    "test": "Tests",
+    "chore": "Chores",
+    "other": "Other changes",
+}
+
 
 class FileChange:
     def __init__(self, filename: str):
@@ -33,11 +58,88 @@ class FileChange:
                 self.deleted = self.deleted.replace(line, '')
 
 
-client = openai.OpenAI()
+class DiffParser:
+    def __init__(self):
+        self.changes: Dict[str, FileChange] = {}
+        self.current_file: Optional[str] = None
+
+    def feed(self, line: str):
+        if line.startswith("diff --git"):
+            self.current_file = line.split(" ")[-1][2:]
+            self.changes[self.current_file] = FileChange(self.current_file)
+            return
+
+        if line.startswith("+++ ") or line.startswith("--- "):
+            return
+
+        if line.startswith("@@ "):
+            return
+
+        if line.startswith("+") and self.current_file:
+            self.changes[self.current_file].append_added_line(line[1:])
+            return
+
+        if line.startswith("-") and self.current_file:
+            self.changes[self.current_file].append_deleted_line(line[1:])
+            return
+
+
+class Commit:
+    def __init__(self, sha: str, subject: str):
+        self.sha = sha
+        self.subject = subject
+        self.parser = DiffParser()
+        self.parsed_characters = 0
+
+    def feed(self, line: str):
+        """
+        Feeds a diff line, ignoring lines once MAX_COMMIT_CHANGES_CHARACTERS were parsed,
+        so huge commits (lockfiles, vendored code) stay cheap to clean up.
+        """
+        if self.parsed_characters >= MAX_COMMIT_CHANGES_CHARACTERS:
+            return
+
+        self.parser.feed(line)
+        self.parsed_characters += len(line) + 1
+
+    def has_changes(self) -> bool:
+        return len(self.parser.changes) > 0
+
+    def changes_to_string(self) -> str:
+        message = ''
+        for file_changes in self.parser.changes.values():
+            file_changes.cleanup()
+            message += file_changes.to_string()
+        return message[:MAX_COMMIT_CHANGES_CHARACTERS]
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute: int):
+        self.interval = 60 / requests_per_minute
+        self.next_request_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            request_time = max(now, self.next_request_time)
+            self.next_request_time = request_time + self.interval
+
+        time.sleep(request_time - now)
+
+
+_client = None
+
+
+def get_client() -> openai.OpenAI:
+    global _client
+    if _client is None:
+        _client = openai.OpenAI()
+    return _client
 
 
 def ask_chatgpt(messages):
-    response = client.chat.completions.create(
+    response = get_client().chat.completions.create(
         model="gpt-3.5-turbo",
         messages=messages
     )
@@ -63,6 +165,18 @@ prompt_role = ("You are an commit message analyzer. \
     ...")
 
 
+commit_prompt_role = ("You are an commit analyzer writing release notes. \
+    Your task is to analyze a single commit and summarize its business change in one sentence. \
+    Clause COMMIT_SUBJECT contains the commit subject, COMMIT_CHANGES contains changed files, \
+    where FILE contains name of changed file, ADDED LINES contains lines which are added to file, \
+    DELETED LINES contains list of lines which are deleted from file. \
+    I expect the following output format: \n\
+    CATEGORY: one of feature, fix, performance, refactor, docs, test, chore, other \n\
+    summary sentence")
+
+commit_prompt_hash = hashlib.sha256(commit_prompt_role.encode("utf-8")).hexdigest()
+
+
 def generate_commit_message(length_characters: int, style: str, changes: str) -> str:
     prompt = (f"{prompt_role} \
         LENGTH: max {length_characters} characters \
@@ -74,32 +188,47 @@ def generate_commit_message(length_characters: int, style: str, changes: str) ->
 def get_cached_changes() -> Dict[str, FileChange]:
     diff_output = subprocess.check_output(["git", "diff", "--cached"]).decode("utf-8")
 
-    diff_lines = diff_output.split("\n")
+    parser = DiffParser()
+    for line in diff_output.split("\n"):
+        parser.feed(line)
 
-    changes = {}
-    current_file = None
+    return parser.changes
 
-    for line in diff_lines:
-        if line.startswith("diff --git"):
-            current_file = line.split(" ")[-1][2:]
-            changes[current_file] = FileChange(current_file)
-            continue
 
-        if line.startswith("+++ ") or line.startswith("--- "):
-            continue
+def get_range_commits(commit_range: str, skipped_shas) -> Iterator[Commit]:
+    """
+    Streams non-merge commits of the range from `git log -p`, oldest first.
+    Diffs of commits in skipped_shas are not parsed.
+    """
+    process = subprocess.Popen(
+        ["git", "log", "-p", "--reverse", "--no-merges", "--no-color", f"--format={COMMIT_MARKER}%H %s",
+         commit_range],
+        stdout=subprocess.PIPE, encoding="utf-8", errors="replace"
+    )
 
-        if line.startswith("@@ "):
-            continue
+    yield from parse_commits(process.stdout, skipped_shas)
 
-        if line.startswith("+") and current_file:
-            changes[current_file].append_added_line(line[1:])
-            continue
+    if process.wait() != 0:
+        raise subprocess.CalledProcessError(process.returncode, process.args)
+
+
+def parse_commits(log_lines: Iterable[str], skipped_shas) -> Iterator[Commit]:
+    commit = None
+    for line in log_lines:
+        line = line.rstrip("\n")
 
-        if line.startswith("-") and current_file:
-            changes[current_file].append_deleted_line(line[1:])
+        if line.startswith(COMMIT_MARKER):
+            if commit is not None:
+                yield commit
+            sha, _, subject = line[len(COMMIT_MARKER):].partition(" ")
+            commit = Commit(sha, subject)
             continue
 
-    return changes
+        if commit is not None and commit.sha not in skipped_shas:
+            commit.feed(line)
+
+    if commit is not None:
+        yield commit
 
 
 def generate_commit_messages():
@@ -116,5 +245,116 @@ def generate_commit_messages():
     print(resp)
 
 
+def summarize_commit(commit: Commit, rate_limiter: RateLimiter) -> Dict[str, str]:
+    if not commit.has_changes():
+        return {"category": CHANGELOG_CATEGORIES[-1], "summary": commit.subject}
+
+    prompt = (f"{commit_prompt_role} \
+        COMMIT_SUBJECT: {commit.subject} \
+        COMMIT_CHANGES: {commit.changes_to_string()}")
+
+    rate_limiter.wait()
+    return parse_commit_summary(ask_chatgpt([{"role": "user", "content": prompt}]), commit.subject)
+
+
+def parse_commit_summary(response: str, subject: str) -> Dict[str, str]:
+    category = CHANGELOG_CATEGORIES[-1]
+    summary_lines = []
+    for line in response.splitlines():
+        if line.upper().startswith("CATEGORY:"):
+            value = line.split(":", 1)[1].strip().lower()
+            category = value if value in CHANGELOG_CATEGORIES else category
+        elif line.strip():
+            summary_lines.append(line.strip().lstrip("- "))
+
+    return {"category": category, "summary": " ".join(summary_lines) or subject}
+
+
+def get_summaries_cache_path() -> str:
+    git_dir = subprocess.check_output(["git", "rev-parse", "--git-dir"]).decode("utf-8").strip()
+    return os.path.join(git_dir, COMMIT_SUMMARIES_FILENAME)
+
+
+def load_commit_summaries(path: str) -> Dict[str, Dict[str, str]]:
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, "r", encoding="utf-8") as file:
+        cache = json.load(file)
+
+    if cache.get("prompt_hash") != commit_prompt_hash:
+        return {}
+
+    return cache["commits"]
+
+
+def save_commit_summaries(path: str, summaries: Dict[str, Dict[str, str]]):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"prompt_hash": commit_prompt_hash, "commits": summaries}, file)
+
+
+def to_changelog(shas: List[str], summaries: Dict[str, Dict[str, str]]) -> str:
+    groups = {category: [] for category in CHANGELOG_CATEGORIES}
+    for sha in shas:
+        summary = summaries[sha]
+        groups[summary["category"]].append(f"- {summary['summary']} ({sha[:7]})")
+
+    sections = []
+    for category, lines in groups.items():
+        if lines:
+            sections.append(f"## {CHANGELOG_TITLES[category]}\n" + "\n".join(lines))
+
+    return "\n\n".join(sections)
+
+
+def generate_release_notes(commit_range: str):
+    cache_path = get_summaries_cache_path()
+    summaries = load_commit_summaries(cache_path)
+    rate_limiter = RateLimiter(REQUESTS_PER_MINUTE)
+
+    shas = []
+    futures = {}
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            try:
+                for commit in get_range_commits(commit_range, summaries):
+                    shas.append(commit.sha)
+                    if commit.sha not in summaries and commit.sha not in futures:
+                        futures[commit.sha] = executor.submit(summarize_commit, commit, rate_limiter)
+
+                for sha, future in futures.items():
+                    summaries[sha] = future.result()
+            except BaseException:
+                # Queued commits are not summarized after a failure, running ones still finish and are saved
+                executor.shutdown(cancel_futures=True)
+                raise
+    finally:
+        for sha, future in futures.items():
+            if future.done() and not future.cancelled() and future.exception() is None:
+                summaries[sha] = future.result()
+        save_commit_summaries(cache_path, summaries)
+
+    print(f"Summarized {len(futures)} of {len(shas)} commits")
+    print(to_changelog(shas, summaries))
+
+
+def print_usage():
+    print('Usage: python commit_msg_generator.py [<from_revision>..<to_revision>]'
+          '\nWithout a range, summarizes staged changes.'
+          '\nExample: python3 commit_msg_generator.py v1.2..v1.3')
+
+
+def main():
+    if len(sys.argv) == 1:
+        generate_commit_messages()
+        return
+
+    if len(sys.argv) > 2 or ".." not in sys.argv[1]:
+        print_usage()
+        return
+
+    generate_release_notes(sys.argv[1])
+
+
 if __name__ == '__main__':
-    generate_commit_messages()
+    main()
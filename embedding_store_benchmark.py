@@ -0,0 +1,94 @@
+import sys
+import time
+
+import numpy as np
+from langchain_community.embeddings import FakeEmbeddings
+from langchain_community.vectorstores.faiss import FAISS
+from langchain_openai import OpenAIEmbeddings
+
+from embedding_store import VECTOR_ENCODINGS, decode_vector_store, encode_vector_store
+from tools import get_pages_from_pdf
+
+"""
+Compares the size and recall@k of the embedding store encodings with the pickled FAISS store of a PDF.
+Documents are the PDF chunks make_vectors caches. Vectors are synthetic unless "openai" is passed,
+then they are real OpenAI embeddings of the chunks (needs OPENAI_API_KEY and costs embedding calls).
+Recall is measured by searching each stored vector, or the first QUERIES of them, against the decoded store.
+"""
+
+OPENAI_VECTORS = 'openai'
+DIMENSION = 1536
+TOPICS = 50
+NEIGHBOURS = 10
+QUERIES = 200
+
+
+def make_synthetic_vectors(count: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((TOPICS, DIMENSION))
+    vectors = centers[rng.integers(0, TOPICS, count)] + 0.5 * rng.standard_normal((count, DIMENSION))
+    vectors = vectors.astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def create_store(filename: str, use_openai: bool) -> FAISS:
+    documents = get_pages_from_pdf(filename, 0, None)
+
+    if use_openai:
+        return FAISS.from_documents(documents, OpenAIEmbeddings())
+
+    vectors = make_synthetic_vectors(len(documents))
+    return FAISS.from_embeddings(
+        text_embeddings=[(document.page_content, vector) for document, vector in zip(documents, vectors.tolist())],
+        embedding=FakeEmbeddings(size=DIMENSION),
+        metadatas=[document.metadata for document in documents]
+    )
+
+
+def recall_at_k(expected: np.ndarray, found: np.ndarray) -> float:
+    hits = sum(len(set(expected_row) & set(found_row)) for expected_row, found_row in zip(expected, found))
+    return hits / expected.size
+
+
+def print_usage():
+    print('Usage: python embedding_store_benchmark.py <input_pdf_file> [openai]'
+          '\nExample: python3 embedding_store_benchmark.py /home/example-user/book.pdf openai')
+
+
+def main():
+    if len(sys.argv) < 2:
+        print_usage()
+        return
+
+    use_openai = len(sys.argv) >= 3 and sys.argv[2] == OPENAI_VECTORS
+    store = create_store(sys.argv[1], use_openai)
+
+    count = store.index.ntotal
+    queries = store.index.reconstruct_n(0, min(count, QUERIES))
+    neighbours = min(count, NEIGHBOURS)
+    _, expected = store.index.search(queries, neighbours)
+
+    pickled_size = len(store.serialize_to_bytes())
+    print(f'{count} chunks, {"OpenAI" if use_openai else "synthetic"} vectors, '
+          f'pickled FAISS store: {pickled_size / 1024:.0f} KiB')
+    print(f'{"encoding":<10}{"vectors KiB":>14}{"documents KiB":>16}{"ratio":>8}{"recall@" + str(neighbours):>12}'
+          f'{"encode s":>11}{"decode s":>11}')
+
+    for encoding in VECTOR_ENCODINGS:
+        start = time.perf_counter()
+        header, encoded_vectors, documents = encode_vector_store(store, encoding)
+        encode_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        decoded = decode_vector_store(header, encoded_vectors, documents, store.embeddings)
+        decode_time = time.perf_counter() - start
+
+        _, found = decoded.index.search(queries, neighbours)
+        size = len(encoded_vectors) + len(documents)
+        print(f'{header["encoding"]:<10}{len(encoded_vectors) / 1024:>14.0f}{len(documents) / 1024:>16.0f}'
+              f'{pickled_size / size:>8.1f}{recall_at_k(expected, found):>12.3f}'
+              f'{encode_time:>11.2f}{decode_time:>11.2f}')
+
+
+if __name__ == '__main__':
+    main()
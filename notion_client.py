@@ -1,4 +1,4 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 import requests
 from pyxtension.streams import stream
@@ -42,6 +42,9 @@ class IdExtractor:
 class NotionClient:
     TEXT_BLOCK_TYPES = ["paragraph", "heading_1", "heading_2", "heading_3"]
     BASE_NOTION_API_URL = "https://api.notion.com/v1"
+    MAX_CHILDREN_PER_REQUEST = 100
+    MAX_BLOCKS_PER_REQUEST = 1000
+    MAX_NESTING_DEPTH = 2
 
     def __init__(self, notion_token):
         self.headers = {
@@ -133,6 +136,45 @@ class NotionClient:
         )
         return self._response_or_error(response)
 
+    def append_blocks(self, parent_id: str, blocks: List[Dict[str, Any]]):
+        """
+        Append a list of blocks, possibly nested, using as few requests as the API allows.
+        Blocks whose children do not fit into a single request are appended without children,
+        and their children are appended to them in follow-up requests.
+        https://developers.notion.com/reference/patch-block-children
+        :param parent_id: The parent block where blocks are added
+        :param blocks: Array of blocks to be added, e.g. the output of notion_markdown.markdown_to_blocks
+        :return: Last appended batch or the first error
+        """
+        parent_id = self.extractor.get_id_from_url(parent_id)
+        response = {}
+        batch = []
+        deferred_children = []
+        batch_size = 0
+
+        for block in blocks:
+            size = self._request_size(block)
+            children = None
+            if size is None:
+                children = block[block["type"]]["children"]
+                block = self._without_children(block)
+                size = 1
+
+            if len(batch) == self.MAX_CHILDREN_PER_REQUEST or batch_size + size > self.MAX_BLOCKS_PER_REQUEST:
+                response = self._append_batch(parent_id, batch, deferred_children)
+                if "error" in response:
+                    return response
+                batch, deferred_children, batch_size = [], [], 0
+
+            batch.append(block)
+            deferred_children.append(children)
+            batch_size += size
+
+        if batch:
+            response = self._append_batch(parent_id, batch, deferred_children)
+
+        return response
+
     def delete_block(self, block_id: str):
         """
         Delete a block
@@ -261,6 +303,43 @@ class NotionClient:
 
         return self.append_child_blocks(parent_id, append_children)
 
+    def _append_batch(self, parent_id: str, batch: List[Dict[str, Any]],
+                      deferred_children: List[Optional[List[Dict[str, Any]]]]) -> Dict[str, Any]:
+        response = self.append_child_blocks(parent_id, batch)
+        if "error" in response:
+            return response
+
+        for appended_block, children in zip(response["results"], deferred_children):
+            if children:
+                children_response = self.append_blocks(appended_block["id"], children)
+                if "error" in children_response:
+                    return children_response
+
+        return response
+
+    def _request_size(self, block: Dict[str, Any], depth: int = 0) -> Optional[int]:
+        """
+        Counts the block and its descendants, or returns None when they do not fit into a single request.
+        """
+        children = block[block["type"]].get("children", [])
+        if children and (depth >= self.MAX_NESTING_DEPTH or len(children) > self.MAX_CHILDREN_PER_REQUEST):
+            return None
+
+        size = 1
+        for child in children:
+            child_size = self._request_size(child, depth + 1)
+            if child_size is None:
+                return None
+            size += child_size
+
+        return size if size <= self.MAX_BLOCKS_PER_REQUEST else None
+
+    @staticmethod
+    def _without_children(block: Dict[str, Any]) -> Dict[str, Any]:
+        block_type = block["type"]
+        content = {key: value for key, value in block[block_type].items() if key != "children"}
+        return {**block, block_type: content}
+
     @staticmethod
     def _to_bullet_items(items: List[str]) -> List[Dict[str, Any]]:
         return stream(items).map(lambda s: {
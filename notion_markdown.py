@@ -0,0 +1,277 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+"""
+Compiles markdown (as returned by the LLM) into a tree of Notion blocks in a single pass over the text.
+The result can be passed directly to NotionClient.append_blocks.
+"""
+
+Block = Dict[str, Any]
+
+MAX_RICH_TEXT_LENGTH = 2000
+TAB_WIDTH = 4
+
+FENCE_PATTERN = re.compile(r'^(\s*)(```|~~~)\s*([\w+#.-]*)\s*$')
+HEADING_PATTERN = re.compile(r'^\s*(#{1,6})\s+(.*?)(\s+#+)?\s*$')
+DIVIDER_PATTERN = re.compile(r'^\s*([-*_])(\s*\1){2,}\s*$')
+QUOTE_PATTERN = re.compile(r'^(\s*)>\s?(.*)$')
+BULLET_PATTERN = re.compile(r'^(\s*)[-*+]\s+(.*)$')
+NUMBERED_PATTERN = re.compile(r'^(\s*)\d+[.)]\s+(.*)$')
+INLINE_PATTERN = re.compile(
+    r'`(?P<code>[^`]+)`'
+    r'|\*\*(?P<bold>.+?)\*\*'
+    # Emphasis only at word boundaries, so dunder names, snake_case and a*b*c are kept as written
+    r'|(?<!\w)__(?!\w+__)(?=\S)(?P<underscore_bold>.+?)(?<=\S)__(?!\w)'
+    r'|(?<![\w*])\*(?=\S)(?P<italic>[^*]+?)(?<=\S)\*(?![\w*])'
+    r'|\[(?P<link_text>[^\]]+)\]\((?P<link_url>https?://[^)\s]+)\)'
+)
+
+WRAPPER_FENCE_LANGUAGES = ('', 'markdown', 'md')
+CODE_LANGUAGE_ALIASES = {
+    'py': 'python',
+    'js': 'javascript',
+    'ts': 'typescript',
+    'sh': 'shell',
+    'bash': 'shell',
+    'zsh': 'shell',
+    'yml': 'yaml',
+    'md': 'markdown',
+    'c++': 'c++',
+    'cpp': 'c++',
+    'cs': 'c#',
+    'csharp': 'c#',
+    'rs': 'rust',
+    'kt': 'kotlin',
+    'rb': 'ruby',
+    'text': 'plain text',
+    'txt': 'plain text',
+}
+CODE_LANGUAGES = {
+    'bash', 'c', 'c#', 'c++', 'css', 'docker', 'go', 'graphql', 'html', 'java', 'javascript', 'json',
+    'kotlin', 'makefile', 'markdown', 'plain text', 'python', 'ruby', 'rust', 'scala', 'shell', 'sql',
+    'swift', 'typescript', 'xml', 'yaml',
+}
+
+
+def markdown_to_blocks(text: str) -> List[Block]:
+    """
+    Compiles markdown text into Notion blocks.
+    Supports headings, nested bulleted and numbered lists, quotes, dividers, fenced code blocks and
+    bold/italic/code/link inline formatting. A fence wrapping the whole document is removed.
+    :param text: The markdown text
+    :return: List of top level blocks, nested blocks are stored in "children"
+    """
+    return _MarkdownCompiler().compile(text)
+
+
+def to_rich_text(text: str) -> List[Dict[str, Any]]:
+    """
+    Converts inline markdown into Notion rich text objects.
+    :param text: Single line of markdown
+    :return: List of rich text objects
+    """
+    rich_text = []
+    position = 0
+
+    for match in INLINE_PATTERN.finditer(text):
+        if match.start() > position:
+            rich_text.extend(_text_objects(text[position:match.start()]))
+
+        if match.group('code') is not None:
+            rich_text.extend(_text_objects(match.group('code'), code=True))
+        elif match.group('bold') is not None:
+            rich_text.extend(_text_objects(match.group('bold'), bold=True))
+        elif match.group('underscore_bold') is not None:
+            rich_text.extend(_text_objects(match.group('underscore_bold'), bold=True))
+        elif match.group('italic') is not None:
+            rich_text.extend(_text_objects(match.group('italic'), italic=True))
+        else:
+            rich_text.extend(_text_objects(match.group('link_text'), link=match.group('link_url')))
+
+        position = match.end()
+
+    if position < len(text):
+        rich_text.extend(_text_objects(text[position:]))
+
+    return rich_text
+
+
+def _text_objects(content: str, link: str = None, **annotations: bool) -> List[Dict[str, Any]]:
+    objects = []
+
+    for start in range(0, len(content), MAX_RICH_TEXT_LENGTH):
+        text_object = {
+            "type": "text",
+            "text": {
+                "content": content[start:start + MAX_RICH_TEXT_LENGTH]
+            }
+        }
+        if link is not None:
+            text_object["text"]["link"] = {"url": link}
+        if annotations:
+            text_object["annotations"] = annotations
+        objects.append(text_object)
+
+    return objects
+
+
+def _indent_width(whitespace: str) -> int:
+    return len(whitespace.expandtabs(TAB_WIDTH))
+
+
+def _code_language(language: str) -> str:
+    language = language.lower()
+    language = CODE_LANGUAGE_ALIASES.get(language, language)
+    return language if language in CODE_LANGUAGES else 'plain text'
+
+
+def _text_block(block_type: str, text: str) -> Block:
+    return {
+        "type": block_type,
+        block_type: {
+            "rich_text": to_rich_text(text)
+        }
+    }
+
+
+def _unwrap_document(lines: List[str]) -> List[str]:
+    first = 0
+    while first < len(lines) and not lines[first].strip():
+        first += 1
+
+    last = len(lines) - 1
+    while last > first and not lines[last].strip():
+        last -= 1
+
+    if last <= first:
+        return lines
+
+    opening = FENCE_PATTERN.match(lines[first])
+    closing = FENCE_PATTERN.match(lines[last])
+
+    if opening is None or closing is None or closing.group(3):
+        return lines
+
+    if opening.group(3).lower() not in WRAPPER_FENCE_LANGUAGES:
+        return lines
+
+    return lines[first + 1:last]
+
+
+class _MarkdownCompiler:
+    def __init__(self):
+        self.blocks: List[Block] = []
+        self.list_stack: List[Tuple[int, Block]] = []
+        self.paragraph: List[str] = []
+        self.paragraph_indent = 0
+        self.code_fence: Optional[Tuple[int, str, str]] = None
+        self.code_lines: List[str] = []
+        self.continues_list_item = False
+
+    def compile(self, text: str) -> List[Block]:
+        for line in _unwrap_document(text.splitlines()):
+            self._compile_line(line)
+
+        self._flush_paragraph()
+        if self.code_fence is not None:
+            self._flush_code()
+
+        return self.blocks
+
+    def _compile_line(self, line: str) -> None:
+        if self.code_fence is not None:
+            indent, fence, _ = self.code_fence
+            fence_match = FENCE_PATTERN.match(line)
+            if fence_match and fence_match.group(2) == fence and not fence_match.group(3):
+                self._flush_code()
+            else:
+                self.code_lines.append(line[indent:] if not line[:indent].strip() else line.lstrip())
+            return
+
+        if not line.strip():
+            self._flush_paragraph()
+            self.continues_list_item = False
+            return
+
+        fence_match = FENCE_PATTERN.match(line)
+        if fence_match:
+            self._flush_paragraph()
+            self.code_fence = (len(fence_match.group(1)), fence_match.group(2), fence_match.group(3))
+            return
+
+        heading_match = HEADING_PATTERN.match(line)
+        if heading_match:
+            self._flush_paragraph()
+            level = min(len(heading_match.group(1)), 3)
+            self._attach(0, _text_block(f"heading_{level}", heading_match.group(2)))
+            return
+
+        if DIVIDER_PATTERN.match(line):
+            self._flush_paragraph()
+            self._attach(0, {"type": "divider", "divider": {}})
+            return
+
+        quote_match = QUOTE_PATTERN.match(line)
+        if quote_match:
+            self._flush_paragraph()
+            self._attach(_indent_width(quote_match.group(1)), _text_block("quote", quote_match.group(2)))
+            return
+
+        bullet_match = BULLET_PATTERN.match(line)
+        if bullet_match:
+            self._add_list_item("bulleted_list_item", bullet_match)
+            return
+
+        numbered_match = NUMBERED_PATTERN.match(line)
+        if numbered_match:
+            self._add_list_item("numbered_list_item", numbered_match)
+            return
+
+        if self.continues_list_item:
+            _, item = self.list_stack[-1]
+            item[item["type"]]["rich_text"].extend(to_rich_text(' ' + line.strip()))
+            return
+
+        if not self.paragraph:
+            self.paragraph_indent = _indent_width(line[:len(line) - len(line.lstrip())])
+        self.paragraph.append(line.strip())
+
+    def _add_list_item(self, block_type: str, match: re.Match) -> None:
+        self._flush_paragraph()
+        indent = _indent_width(match.group(1))
+        item = _text_block(block_type, match.group(2))
+        self._attach(indent, item)
+        self.list_stack.append((indent, item))
+        self.continues_list_item = True
+
+    def _attach(self, indent: int, block: Block) -> None:
+        self.continues_list_item = False
+
+        while self.list_stack and self.list_stack[-1][0] >= indent:
+            self.list_stack.pop()
+
+        if not self.list_stack:
+            self.blocks.append(block)
+            return
+
+        _, parent = self.list_stack[-1]
+        parent[parent["type"]].setdefault("children", []).append(block)
+
+    def _flush_paragraph(self) -> None:
+        if not self.paragraph:
+            return
+
+        self._attach(self.paragraph_indent, _text_block("paragraph", ' '.join(self.paragraph)))
+        self.paragraph = []
+
+    def _flush_code(self) -> None:
+        indent, _, language = self.code_fence
+        self._attach(indent, {
+            "type": "code",
+            "code": {
+                "rich_text": _text_objects('\n'.join(self.code_lines)),
+                "language": _code_language(language)
+            }
+        })
+        self.code_fence = None
+        self.code_lines = []
@@ -2,14 +2,17 @@ import os
 import sys
 from typing import List, Tuple
 
-from langchain.chains.summarize import load_summarize_chain
 from langchain_core.documents import Document
 from langchain_core.prompts import PromptTemplate
 from langchain_openai import OpenAI
-from pyxtension.streams import stream
 
 from notion_client import NotionClient
-from tools import get_pages_from_pdf, save_md_file
+from notion_markdown import markdown_to_blocks
+from summary_tree import LEVEL_CHAPTER, SummaryTree, build_tree, content_hash
+from tools import create_redis_client, get_book_outline, get_book_pages, get_file_hash, save_md_file
+
+BOOK_MODE = 'book'
+CHAPTERS_MODE = 'chapters'
 
 COMBINE_PROMPT = """
     Write a concise summary of the following text delimited by triple backquotes.
@@ -26,22 +29,54 @@ MAP_PROMPT = """
     """
 
 
-def get_summary_from_pdf(end_page, filename, llm, start_page, begin_paragraph, end_paragraph):
+def create_summary_tree(filename, llm, redis_client) -> SummaryTree:
     map_prompt_template = create_prompt_template(MAP_PROMPT)
     combine_prompt_template = create_prompt_template(COMBINE_PROMPT)
-    summary_chain = load_summarize_chain(llm=llm,
-                                         chain_type='map_reduce',
-                                         map_prompt=map_prompt_template,
-                                         combine_prompt=combine_prompt_template,
-                                         )
-    pages = get_pages_from_pdf(filename, start_page, end_page)
+    hashmap_name = f'summary_tree:{get_file_hash(filename)}:{content_hash(MAP_PROMPT, COMBINE_PROMPT)}'
+
+    return SummaryTree(
+        redis_client=redis_client,
+        hashmap_name=hashmap_name,
+        summarize_text=lambda text: llm.invoke(map_prompt_template.format(text=text)),
+        combine_summaries=lambda summaries: llm.invoke(combine_prompt_template.format(text='\n'.join(summaries)))
+    )
+
+
+def get_summary_from_pdf(end_page, filename, llm, start_page, begin_paragraph, end_paragraph, redis_client):
+    page_texts = [page.page_content for page in get_book_pages(filename)]
+
+    range_pages = [Document(page_content=text) for text in page_texts[start_page:end_page]]
+    trimmed_pages = trim_content(begin_paragraph, end_paragraph, range_pages)
+    page_overrides = {
+        start_page + idx: page.page_content
+        for idx, page in enumerate(trimmed_pages)
+        if page.page_content != page_texts[start_page + idx]
+    }
+
+    root = build_tree(page_texts, get_book_outline(filename), start_page, end_page, page_overrides)
+    summary_tree = create_summary_tree(filename, llm, redis_client)
+
+    output = summary_tree.summarize(root)
+    notify_computed_nodes(summary_tree)
+    return output
+
 
-    pages = trim_content(begin_paragraph, end_paragraph, pages)
+def get_book_summary(filename, llm, mode, redis_client):
+    pages = get_book_pages(filename)
 
-    output = summary_chain.run(pages)
+    root = build_tree([page.page_content for page in pages], get_book_outline(filename))
+    summary_tree = create_summary_tree(filename, llm, redis_client)
+
+    nodes = root.find(LEVEL_CHAPTER) if mode == CHAPTERS_MODE else [root]
+    output = '\n\n'.join(summary_tree.summarize(node) for node in nodes or [root])
+    notify_computed_nodes(summary_tree)
     return output
 
 
+def notify_computed_nodes(summary_tree: SummaryTree):
+    print(f'Summarized {summary_tree.computed_nodes} new or changed nodes')
+
+
 def notify_end_paragraph_not_found(pages):
     print('End paragraph not found')
     print(pages[-1].page_content)
@@ -95,46 +130,51 @@ def extract_args() -> Tuple[int, str, str, int, str, str]:
 def print_usage():
     print('Usage: python pdf_summarizer.py '
           '<input_pdf_file> <start_page> <end_page> <output> <begin_paragraph> <end_paragraph>'
-          '\nExample: python3 pdf_summarizer.py /home/example-user/book.pdf 3 6 /home/example-user/out.md')
-
-
-def cleanup_lines(lines: List[str], page: str) -> List[str]:
-    return (stream(lines)
-            .filter(lambda line: line != '')
-            .filter(lambda line: page not in line)
-            .filter(lambda line: not line.startswith('#'))
-            .map(lambda line: line.replace('-', ''))
-            .map(lambda line: line.replace('"', ''))
-            .map(lambda line: line[1:] if line.startswith(' ') else line)
-            .toList())
+          '\n       python pdf_summarizer.py <input_pdf_file> book|chapters <output>'
+          '\nExample: python3 pdf_summarizer.py /home/example-user/book.pdf 3 6 /home/example-user/out.md'
+          '\nExample: python3 pdf_summarizer.py /home/example-user/book.pdf chapters /home/example-user/out.md')
 
 
 def save_to_notion(text: str, page: str) -> None:
     client = NotionClient(os.environ['NOTION_TOKEN'])
+    response = client.append_blocks(parent_id=page, blocks=markdown_to_blocks(text))
 
-    lines = text.splitlines()
-    lines = lines[1:-1]
+    if "error" in response:
+        notify_notion_error(response)
 
-    client.append_heading_2(parent_id=page, text=lines[0][2:-1])
 
-    lines = cleanup_lines(lines, page)
-    client.append_bulleted_list_items(parent_id=page, items=lines)
+def notify_notion_error(response):
+    print(f'Saving to Notion failed with code {response["code"]}')
+    print(response["error"])
 
 
 def is_notion_page(output_filename: str) -> bool:
     return output_filename.startswith('https://www.notion.so')
 
 
+def is_book_mode() -> bool:
+    return len(sys.argv) >= 4 and sys.argv[2] in (BOOK_MODE, CHAPTERS_MODE)
+
+
 def main():
-    if len(sys.argv) < 5:
+    if len(sys.argv) < 5 and not is_book_mode():
         print_usage()
         return
 
-    end_page, filename, output_dest, start_page, begin_paragraph, end_paragraph = extract_args()
-
     llm = OpenAI()
+    redis_client = create_redis_client()
 
-    summary = get_summary_from_pdf(end_page, filename, llm, start_page, begin_paragraph, end_paragraph)
+    if is_book_mode():
+        filename, mode, output_dest = sys.argv[1:4]
+        summary = get_book_summary(filename, llm, mode, redis_client)
+    else:
+        end_page, filename, output_dest, start_page, begin_paragraph, end_paragraph = extract_args()
+        try:
+            summary = get_summary_from_pdf(end_page, filename, llm, start_page, begin_paragraph, end_paragraph,
+                                           redis_client)
+        except ValueError as error:
+            print(error)
+            return
 
     if is_notion_page(output_dest):
         save_to_notion(text=summary, page=output_dest)
@@ -0,0 +1,202 @@
+import hashlib
+import json
+from typing import Callable, Dict, List, Optional
+
+"""
+Hierarchical summaries of a book: page chunks -> sections -> chapters -> book.
+Every node caches its summary together with the hash of its inputs, so only new or stale nodes are summarized.
+"""
+
+CHUNK_PAGES = 4
+# Bounds the number of child summaries combined in one prompt, so it fits the model context
+MAX_FAN_IN = 8
+
+LEVEL_CHUNK = 'chunk'
+LEVEL_SECTION = 'section'
+LEVEL_CHAPTER = 'chapter'
+LEVEL_BOOK = 'book'
+LEVEL_RANGE = 'range'
+LEVEL_GROUP = 'group'
+
+
+class Section:
+    def __init__(self, title: str, start_page: int, end_page: int, children: List['Section'] = None):
+        self.title = title
+        self.start_page = start_page
+        self.end_page = end_page
+        self.children = children or []
+
+
+class SummaryNode:
+    def __init__(self, level: str, title: str, start_page: int, end_page: int,
+                 children: List['SummaryNode'] = None, text: str = None, variant: str = ''):
+        """
+        :param variant: Distinguishes nodes built from overridden (e.g. trimmed) pages, so they are cached
+        next to the nodes built from the unchanged book instead of replacing them
+        """
+        self.level = level
+        self.title = title
+        self.start_page = start_page
+        self.end_page = end_page
+        self.children = children or []
+        self.text = text
+
+        if text is not None:
+            self.input_hash = content_hash(text)
+            self.variant = variant
+        else:
+            self.input_hash = content_hash(*[child.input_hash for child in self.children])
+            child_variants = [child.variant for child in self.children if child.variant]
+            self.variant = content_hash(*child_variants)[:16] if child_variants else ''
+
+    @property
+    def key(self) -> str:
+        key = f'{self.level}:{self.start_page}-{self.end_page}'
+        return f'{key}@{self.variant}' if self.variant else key
+
+    def find(self, level: str) -> List['SummaryNode']:
+        if self.level == level:
+            return [self]
+
+        result = []
+        for child in self.children:
+            result.extend(child.find(level))
+        return result
+
+
+def content_hash(*parts: str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def build_tree(pages: List[str], sections: List[Section], start_page: int = 0,
+               end_page: Optional[int] = None, page_overrides: Dict[int, str] = None) -> SummaryNode:
+    """
+    Builds the summary tree of the pages in [start_page, end_page).
+    Chunks are aligned to CHUNK_PAGES boundaries, so extending the range reuses already summarized chunks.
+    :param pages: Text of every page of the book
+    :param sections: Top level sections (chapters) of the book outline, sorted by start page
+    :param start_page: First page of the range
+    :param end_page: Page after the last page of the range, the whole book when None
+    :param page_overrides: Text replacing some pages, e.g. the first and last page trimmed to a paragraph
+    :return: Root node of the tree
+    """
+    end_page = len(pages) if end_page is None else min(end_page, len(pages))
+    if start_page < 0 or start_page >= end_page:
+        raise ValueError(f'Empty page range {start_page}-{end_page} of a book with {len(pages)} pages')
+
+    level = LEVEL_BOOK if start_page == 0 and end_page == len(pages) else LEVEL_RANGE
+    children = _build_children(pages, page_overrides or {}, sections, LEVEL_CHAPTER, start_page, end_page)
+    return _build_parent(level, '', start_page, end_page, children)
+
+
+def _build_parent(level: str, title: str, start_page: int, end_page: int,
+                  children: List[SummaryNode]) -> SummaryNode:
+    """
+    Groups consecutive children into intermediate nodes until there are at most MAX_FAN_IN of them.
+    """
+    while len(children) > MAX_FAN_IN:
+        groups = [children[start:start + MAX_FAN_IN] for start in range(0, len(children), MAX_FAN_IN)]
+        children = [
+            SummaryNode(f'{level}_{LEVEL_GROUP}', '', group[0].start_page, group[-1].end_page, group)
+            if len(group) > 1 else group[0]
+            for group in groups
+        ]
+
+    return SummaryNode(level, title, start_page, end_page, children)
+
+
+def _build_children(pages: List[str], page_overrides: Dict[int, str], sections: List[Section], level: str,
+                    start_page: int, end_page: int) -> List[SummaryNode]:
+    children = []
+    position = start_page
+
+    for section in sections:
+        section_start = max(section.start_page, position)
+        section_end = min(section.end_page, end_page)
+        if section_start >= section_end:
+            continue
+
+        children.extend(_build_chunks(pages, page_overrides, position, section_start))
+        section_children = _build_children(pages, page_overrides, section.children, LEVEL_SECTION,
+                                           section_start, section_end)
+        children.append(_build_parent(level, section.title, section_start, section_end, section_children))
+        position = section_end
+
+    children.extend(_build_chunks(pages, page_overrides, position, end_page))
+    return children
+
+
+def _build_chunks(pages: List[str], page_overrides: Dict[int, str], start_page: int,
+                  end_page: int) -> List[SummaryNode]:
+    chunks = []
+    chunk_start = start_page
+
+    while chunk_start < end_page:
+        chunk_end = min((chunk_start // CHUNK_PAGES + 1) * CHUNK_PAGES, end_page)
+        text = '\n'.join(page_overrides.get(page, pages[page]) for page in range(chunk_start, chunk_end))
+        overrides = [f'{page}:{page_overrides[page]}' for page in range(chunk_start, chunk_end)
+                     if page in page_overrides]
+        variant = content_hash(*overrides)[:16] if overrides else ''
+        chunks.append(SummaryNode(LEVEL_CHUNK, '', chunk_start, chunk_end, text=text, variant=variant))
+        chunk_start = chunk_end
+
+    return chunks
+
+
+class SummaryTree:
+    """
+    Summarizes SummaryNode trees, caching node summaries in a redis hash.
+    """
+
+    def __init__(self, redis_client, hashmap_name: str, summarize_text: Callable[[str], str],
+                 combine_summaries: Callable[[List[str]], str]):
+        self.redis_client = redis_client
+        self.hashmap_name = hashmap_name
+        self.summarize_text = summarize_text
+        self.combine_summaries = combine_summaries
+        self.computed_nodes = 0
+
+    def summarize(self, node: SummaryNode) -> str:
+        """
+        Returns the node summary, summarizing only the nodes whose cached summary is missing or stale.
+        A node with a single child reuses the child summary.
+        :param node: The node to summarize
+        :return: The summary
+        """
+        if node.text is None and not node.children:
+            return ''
+
+        if node.text is None and len(node.children) == 1:
+            return self.summarize(node.children[0])
+
+        cached = self._get_cached(node)
+        if cached is not None:
+            return cached
+
+        if node.text is not None:
+            summary = self.summarize_text(node.text)
+        else:
+            summary = self.combine_summaries([self.summarize(child) for child in node.children])
+
+        self.computed_nodes += 1
+        self._save(node, summary)
+        return summary
+
+    def _get_cached(self, node: SummaryNode) -> Optional[str]:
+        data = self.redis_client.hget(self.hashmap_name, node.key)
+        if data is None:
+            return None
+
+        entry = json.loads(data)
+        if entry['input_hash'] != node.input_hash:
+            return None
+
+        return entry['summary']
+
+    def _save(self, node: SummaryNode, summary: str) -> None:
+        entry = {'input_hash': node.input_hash, 'summary': summary}
+        self.redis_client.hset(self.hashmap_name, node.key, json.dumps(entry))
@@ -0,0 +1,187 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import commit_msg_generator
+from commit_msg_generator import (COMMIT_MARKER, MAX_COMMIT_CHANGES_CHARACTERS, Commit, DiffParser,
+                                  load_commit_summaries, parse_commit_summary, parse_commits,
+                                  save_commit_summaries, to_changelog)
+
+LOG = [
+    f"{COMMIT_MARKER}aaaaaaa1 Add parser\n",
+    "diff --git a/parser.py b/parser.py\n",
+    "--- a/parser.py\n",
+    "+++ b/parser.py\n",
+    "@@ -1,1 +1,2 @@\n",
+    "+import re\n",
+    "-import os\n",
+    f"{COMMIT_MARKER}bbbbbbb2 Fix typo\n",
+    "diff --git a/Readme.md b/Readme.md\n",
+    "+Scripts\n",
+    f"{COMMIT_MARKER}ccccccc3 Empty commit\n",
+]
+
+
+class TestDiffParser:
+
+    #  Given a diff of a file, added and deleted lines should be collected without diff headers.
+    def test_collects_added_and_deleted_lines(self):
+        # Given
+        parser = DiffParser()
+
+        # When
+        for line in LOG[1:7]:
+            parser.feed(line.rstrip("\n"))
+
+        # Then
+        assert list(parser.changes) == ["parser.py"]
+        assert parser.changes["parser.py"].added == "import re\n"
+        assert parser.changes["parser.py"].deleted == "import os\n"
+
+
+class TestParseCommits:
+
+    #  Given a log with several marked commits, each commit should get its own sha, subject and changes.
+    def test_parses_multiple_commits(self):
+        # When
+        commits = list(parse_commits(LOG, set()))
+
+        # Then
+        assert [(commit.sha, commit.subject) for commit in commits] == [
+            ("aaaaaaa1", "Add parser"), ("bbbbbbb2", "Fix typo"), ("ccccccc3", "Empty commit")]
+        assert list(commits[0].parser.changes) == ["parser.py"]
+        assert commits[1].parser.changes["Readme.md"].added == "Scripts\n"
+        assert not commits[2].has_changes()
+
+    #  Given skipped shas, the diffs of those commits should not be parsed.
+    def test_skipped_commits_are_not_parsed(self):
+        # When
+        commits = list(parse_commits(LOG, {"aaaaaaa1"}))
+
+        # Then
+        assert [commit.sha for commit in commits] == ["aaaaaaa1", "bbbbbbb2", "ccccccc3"]
+        assert not commits[0].has_changes()
+        assert commits[1].has_changes()
+
+    #  Given a huge commit, parsing should stop once the character budget is reached.
+    def test_huge_commit_is_truncated_while_parsing(self):
+        # Given
+        commit = Commit("aaaaaaa1", "Add lockfile")
+        commit.feed("diff --git a/lock.json b/lock.json")
+
+        # When
+        for idx in range(10 * MAX_COMMIT_CHANGES_CHARACTERS):
+            commit.feed(f"+line {idx}")
+
+        # Then
+        assert len(commit.parser.changes["lock.json"].added) <= MAX_COMMIT_CHANGES_CHARACTERS
+        assert len(commit.changes_to_string()) <= MAX_COMMIT_CHANGES_CHARACTERS
+
+
+class TestParseCommitSummary:
+
+    #  Given a model response with a category line, the category and summary should be extracted.
+    def test_known_category(self):
+        # When
+        summary = parse_commit_summary("CATEGORY: Fix\n- Fixed typo in readme", "Fix typo")
+
+        # Then
+        assert summary == {"category": "fix", "summary": "Fixed typo in readme"}
+
+    #  Given an unknown category or no summary, the category should fall back to "other"
+    #  and the summary to the commit subject.
+    def test_unknown_category_falls_back_to_other(self):
+        # When
+        summary = parse_commit_summary("CATEGORY: improvement", "Fix typo")
+
+        # Then
+        assert summary == {"category": "other", "summary": "Fix typo"}
+
+
+class TestToChangelog:
+
+    #  Given summaries of several categories, groups should follow the category order and keep commit order.
+    def test_groups_by_category(self):
+        # Given
+        summaries = {
+            "aaaaaaa1": {"category": "fix", "summary": "first fix"},
+            "bbbbbbb2": {"category": "feature", "summary": "new feature"},
+            "ccccccc3": {"category": "fix", "summary": "second fix"},
+        }
+
+        # When
+        changelog = to_changelog(["aaaaaaa1", "bbbbbbb2", "ccccccc3"], summaries)
+
+        # Then
+        assert changelog == ("## Features\n- new feature (bbbbbbb)\n\n"
+                             "## Fixes\n- first fix (aaaaaaa)\n- second fix (ccccccc)")
+
+
+class TestCommitSummariesCache:
+
+    #  Given saved summaries, loading them should return the same summaries.
+    def test_round_trip(self, tmp_path):
+        # Given
+        path = str(tmp_path / "commit_summaries.json")
+        summaries = {"aaaaaaa1": {"category": "fix", "summary": "first fix"}}
+
+        # When
+        save_commit_summaries(path, summaries)
+
+        # Then
+        assert load_commit_summaries(path) == summaries
+
+    #  Given summaries saved with a different prompt, they should be ignored.
+    def test_prompt_change_invalidates_cache(self, tmp_path):
+        # Given
+        path = tmp_path / "commit_summaries.json"
+        path.write_text(json.dumps({"prompt_hash": "old", "commits": {"aaaaaaa1": {}}}))
+
+        # When
+        summaries = load_commit_summaries(str(path))
+
+        # Then
+        assert summaries == {}
+
+    #  Given a failing summarization, finished summaries should still be saved and reused by the next run,
+    #  and commits still queued should not be summarized.
+    def test_partial_results_are_saved_on_error(self, tmp_path, monkeypatch):
+        # Given
+        path = str(tmp_path / "commit_summaries.json")
+        log = LOG + [f"{COMMIT_MARKER}ddddddd4 Queued commit\n"]
+        monkeypatch.setattr(commit_msg_generator, "get_summaries_cache_path", lambda: path)
+        monkeypatch.setattr(commit_msg_generator, "get_range_commits",
+                            lambda commit_range, skipped_shas: parse_commits(log, skipped_shas))
+        monkeypatch.setattr(commit_msg_generator, "MAX_WORKERS", 1)
+        shutdown = threading.Event()
+        summarized_shas = []
+
+        class ShutdownSignallingExecutor(ThreadPoolExecutor):
+            def shutdown(self, wait=True, *, cancel_futures=False):
+                super().shutdown(wait=False, cancel_futures=cancel_futures)
+                shutdown.set()
+                super().shutdown(wait=wait)
+
+        def summarize_commit(commit, rate_limiter):
+            summarized_shas.append(commit.sha)
+            if commit.sha == "bbbbbbb2":
+                raise RuntimeError("rate limited")
+            if commit.sha == "ccccccc3":
+                # Keeps the single worker busy until the queue is cancelled, if it started before that
+                shutdown.wait(timeout=5)
+            return {"category": "feature", "summary": commit.subject}
+
+        monkeypatch.setattr(commit_msg_generator, "ThreadPoolExecutor", ShutdownSignallingExecutor)
+        monkeypatch.setattr(commit_msg_generator, "summarize_commit", summarize_commit)
+
+        # When
+        with pytest.raises(RuntimeError):
+            commit_msg_generator.generate_release_notes("v1..v2")
+
+        # Then
+        assert "ddddddd4" not in summarized_shas
+        saved_shas = set(load_commit_summaries(path))
+        assert "aaaaaaa1" in saved_shas
+        assert saved_shas <= {"aaaaaaa1", "ccccccc3"}
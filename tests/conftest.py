@@ -0,0 +1,43 @@
+import pytest
+
+
+class InMemoryRedis:
+    def __init__(self):
+        self.hashes = {}
+
+    def hget(self, name, key):
+        return self.hashes.get(name, {}).get(key)
+
+    def hexists(self, name, key):
+        return key in self.hashes.get(name, {})
+
+    def hset(self, name, key=None, value=None, mapping=None):
+        values = dict(mapping or {})
+        if key is not None:
+            values[key] = value
+        self.hashes.setdefault(name, {}).update(
+            {field: data.encode() if isinstance(data, str) else data for field, data in values.items()})
+        return len(values)
+
+    def hdel(self, name, *keys):
+        return sum(self.hashes.get(name, {}).pop(key, None) is not None for key in keys)
+
+    def pipeline(self, transaction=True):
+        return InMemoryPipeline(self)
+
+
+class InMemoryPipeline:
+    def __init__(self, redis_client: InMemoryRedis):
+        self.redis_client = redis_client
+        self.commands = []
+
+    def __getattr__(self, command):
+        return lambda *args, **kwargs: self.commands.append((command, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.redis_client, command)(*args, **kwargs) for command, args, kwargs in self.commands]
+
+
+@pytest.fixture
+def redis_client() -> InMemoryRedis:
+    return InMemoryRedis()
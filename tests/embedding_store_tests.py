@@ -0,0 +1,141 @@
+import numpy as np
+from langchain_community.embeddings import FakeEmbeddings
+from langchain_community.vectorstores.faiss import FAISS
+
+import embedding_store
+from embedding_store import (FLOAT16_ENCODING, FLOAT32_ENCODING, PQ_ENCODING, decode_vector_store,
+                             encode_vector_store, has_vector_store, load_vector_store, save_vector_store)
+
+DIMENSION = 32
+HASHMAP_NAME = 'embeddings'
+
+
+def create_store(count: int) -> FAISS:
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((count, DIMENSION)).astype(np.float32)
+    texts = [f'- text "{idx}"' for idx in range(count)]
+    metadatas = [{'source': 'book.pdf', 'page': idx} for idx in range(count)]
+    return FAISS.from_embeddings(list(zip(texts, vectors.tolist())), FakeEmbeddings(size=DIMENSION), metadatas)
+
+
+class TestEmbeddingStore:
+
+    #  Given a float32 encoded store, decoding it should restore the same vectors and documents.
+    def test_float32_round_trip(self):
+        # Given
+        store = create_store(10)
+
+        # When
+        header, vectors, documents = encode_vector_store(store, FLOAT32_ENCODING)
+        decoded = decode_vector_store(header, vectors, documents, FakeEmbeddings(size=DIMENSION))
+
+        # Then
+        assert np.array_equal(decoded.index.reconstruct_n(0, 10), store.index.reconstruct_n(0, 10))
+        for position in range(10):
+            original = store.docstore.search(store.index_to_docstore_id[position])
+            restored = decoded.docstore.search(decoded.index_to_docstore_id[position])
+            assert restored == original
+
+    #  Given a float16 encoded store, vectors should take half the space and stay close to the originals.
+    def test_float16_halves_vectors(self):
+        # Given
+        store = create_store(10)
+
+        # When
+        header, vectors, documents = encode_vector_store(store, FLOAT16_ENCODING)
+        decoded = decode_vector_store(header, vectors, documents, FakeEmbeddings(size=DIMENSION))
+
+        # Then
+        assert len(vectors) == 10 * DIMENSION * 2
+        assert np.allclose(decoded.index.reconstruct_n(0, 10), store.index.reconstruct_n(0, 10), atol=1e-2)
+
+    #  Given too few vectors to train product quantization, the store should fall back to float16.
+    def test_pq_falls_back_to_float16_for_small_stores(self):
+        # Given
+        store = create_store(10)
+
+        # When
+        header, _, _ = encode_vector_store(store, PQ_ENCODING)
+
+        # Then
+        assert header['encoding'] == FLOAT16_ENCODING
+
+    #  Given enough vectors to train product quantization but a codebook larger than the float16 vectors,
+    #  the store should fall back to float16.
+    def test_pq_falls_back_to_float16_when_codebook_is_larger(self):
+        # Given
+        store = create_store(300)
+
+        # When
+        header, vectors, _ = encode_vector_store(store, PQ_ENCODING)
+
+        # Then
+        assert header['encoding'] == FLOAT16_ENCODING
+        assert len(vectors) == 300 * DIMENSION * 2
+
+    #  Given a product-quantized store, the decoded store should still find most vectors among their own
+    #  nearest neighbours.
+    def test_pq_round_trip(self):
+        # Given
+        count = 2048
+        store = create_store(count)
+        original_vectors = store.index.reconstruct_n(0, count)
+
+        # When
+        header, vectors, documents = encode_vector_store(store, PQ_ENCODING)
+        decoded = decode_vector_store(header, vectors, documents, FakeEmbeddings(size=DIMENSION))
+        _, found = decoded.index.search(original_vectors, 10)
+
+        # Then
+        assert header['encoding'] == PQ_ENCODING
+        assert len(vectors) < count * DIMENSION * 2
+        assert np.mean([position in row for position, row in enumerate(found)]) >= 0.9
+
+
+class TestRedisVectorStore:
+
+    #  Given a store larger than a chunk, it should be saved in several fields and loaded back.
+    def test_multi_chunk_round_trip(self, monkeypatch, redis_client):
+        # Given
+        monkeypatch.setattr(embedding_store, 'CHUNK_SIZE', 256)
+        store = create_store(10)
+
+        # When
+        save_vector_store(redis_client, HASHMAP_NAME, 'book', store, FLOAT32_ENCODING)
+        loaded = load_vector_store(redis_client, HASHMAP_NAME, 'book', FakeEmbeddings(size=DIMENSION))
+
+        # Then
+        fields = redis_client.hashes[HASHMAP_NAME]
+        assert len([field for field in fields if field.startswith('book:vectors:')]) == 10 * DIMENSION * 4 // 256
+        assert has_vector_store(redis_client, HASHMAP_NAME, 'book')
+        assert np.array_equal(loaded.index.reconstruct_n(0, 10), store.index.reconstruct_n(0, 10))
+
+    #  Given a store saved again with fewer chunks, the stale chunks and the legacy pickle should be removed.
+    def test_resave_removes_stale_and_legacy_fields(self, monkeypatch, redis_client):
+        # Given
+        monkeypatch.setattr(embedding_store, 'CHUNK_SIZE', 256)
+        redis_client.hset(HASHMAP_NAME, 'book', b'legacy pickle')
+        save_vector_store(redis_client, HASHMAP_NAME, 'book', create_store(10), FLOAT32_ENCODING)
+
+        # When
+        save_vector_store(redis_client, HASHMAP_NAME, 'book', create_store(4), FLOAT32_ENCODING)
+
+        # Then
+        fields = redis_client.hashes[HASHMAP_NAME]
+        assert 'book' not in fields
+        assert len([field for field in fields if field.startswith('book:vectors:')]) == 4 * DIMENSION * 4 // 256
+        loaded = load_vector_store(redis_client, HASHMAP_NAME, 'book', FakeEmbeddings(size=DIMENSION))
+        assert loaded.index.ntotal == 4
+
+    #  Given a store with a missing chunk, loading should return None.
+    def test_missing_chunk_returns_none(self, monkeypatch, redis_client):
+        # Given
+        monkeypatch.setattr(embedding_store, 'CHUNK_SIZE', 256)
+        save_vector_store(redis_client, HASHMAP_NAME, 'book', create_store(10), FLOAT32_ENCODING)
+        redis_client.hdel(HASHMAP_NAME, 'book:vectors:1')
+
+        # When
+        loaded = load_vector_store(redis_client, HASHMAP_NAME, 'book', FakeEmbeddings(size=DIMENSION))
+
+        # Then
+        assert loaded is None
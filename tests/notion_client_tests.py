@@ -0,0 +1,92 @@
+from notion_client import NotionClient
+
+
+class RecordingNotionClient(NotionClient):
+    def __init__(self):
+        super().__init__('token')
+        self.requests = []
+
+    def append_child_blocks(self, parent_id: str, children: []):
+        self.requests.append((parent_id, children))
+        return {"results": [{"id": f"{parent_id}/{len(self.requests)}-{idx}"} for idx in range(len(children))]}
+
+
+def bullet(text: str, children: list = None) -> dict:
+    block = {"type": "bulleted_list_item", "bulleted_list_item": {"rich_text": [{"text": {"content": text}}]}}
+    if children is not None:
+        block["bulleted_list_item"]["children"] = children
+    return block
+
+
+def count_blocks(blocks: list) -> int:
+    return sum(1 + count_blocks(block[block["type"]].get("children", [])) for block in blocks)
+
+
+class TestAppendBlocks:
+
+    #  Given more top level blocks than one request accepts, they should be split into batches of 100.
+    def test_top_level_blocks_are_batched(self):
+        # Given
+        client = RecordingNotionClient()
+        blocks = [bullet(str(idx)) for idx in range(250)]
+
+        # When
+        client.append_blocks('page', blocks)
+
+        # Then
+        assert [len(children) for _, children in client.requests] == [100, 100, 50]
+
+    #  Given blocks with children, no request should exceed the total block limit.
+    def test_requests_respect_total_block_limit(self):
+        # Given
+        client = RecordingNotionClient()
+        blocks = [bullet(str(idx), [bullet('child') for _ in range(20)]) for idx in range(100)]
+
+        # When
+        client.append_blocks('page', blocks)
+
+        # Then
+        assert all(count_blocks(children) <= NotionClient.MAX_BLOCKS_PER_REQUEST for _, children in client.requests)
+        assert sum(count_blocks(children) for _, children in client.requests) == 2100
+
+    #  Given a block with more children than a nested array accepts, the children should be appended
+    #  to the block in a follow-up request.
+    def test_overflowing_children_are_appended_to_their_block(self):
+        # Given
+        client = RecordingNotionClient()
+        blocks = [bullet('parent', [bullet(str(idx)) for idx in range(150)])]
+
+        # When
+        client.append_blocks('page', blocks)
+
+        # Then
+        assert client.requests[0] == ('page', [{"type": "bulleted_list_item",
+                                                "bulleted_list_item": {"rich_text": [{"text": {"content": "parent"}}]}}])
+        assert [(parent_id, len(children)) for parent_id, children in client.requests[1:]] == [
+            ('page/1-0', 100), ('page/1-0', 50)]
+        assert "children" in blocks[0]["bulleted_list_item"]
+
+    #  Given blocks nested deeper than one request accepts, deeper levels should be appended to their parents.
+    def test_deep_nesting_is_appended_in_follow_up_requests(self):
+        # Given
+        client = RecordingNotionClient()
+        blocks = [bullet('a', [bullet('b', [bullet('c', [bullet('d', [bullet('e')])])])])]
+
+        # When
+        client.append_blocks('page', blocks)
+
+        # Then
+        assert sum(count_blocks(children) for _, children in client.requests) == 5
+        assert [parent_id for parent_id, _ in client.requests] == ['page', 'page/1-0', 'page/1-0/2-0']
+
+    #  Given an error response, appending should stop and return the error.
+    def test_error_is_returned(self):
+        # Given
+        client = RecordingNotionClient()
+        client.append_child_blocks = lambda parent_id, children: {"code": 400, "error": "invalid"}
+
+        # When
+        response = client.append_blocks('page', [bullet('a')])
+
+        # Then
+        assert response == {"code": 400, "error": "invalid"}
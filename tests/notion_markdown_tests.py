@@ -0,0 +1,141 @@
+from notion_markdown import markdown_to_blocks, to_rich_text, MAX_RICH_TEXT_LENGTH
+
+
+def plain_text(block: dict) -> str:
+    return ''.join(item["text"]["content"] for item in block[block["type"]]["rich_text"])
+
+
+class TestMarkdownToBlocks:
+
+    #  Given a summary wrapped in a markdown fence, the wrapper should be removed and the content compiled
+    #  without dropping hyphens or quotes from the text.
+    def test_wrapped_summary(self):
+        # Given
+        text = '```markdown\n## Chapter "One"\n- self-contained point\n- second point\n```'
+
+        # When
+        blocks = markdown_to_blocks(text)
+
+        # Then
+        assert [block["type"] for block in blocks] == ["heading_2", "bulleted_list_item", "bulleted_list_item"]
+        assert plain_text(blocks[0]) == 'Chapter "One"'
+        assert plain_text(blocks[1]) == "self-contained point"
+
+    #  Given nested bulleted and numbered lists, items should be attached as children of their parent item.
+    def test_nested_lists(self):
+        # Given
+        text = "1. first\n   - nested\n     - deeper\n2. second"
+
+        # When
+        blocks = markdown_to_blocks(text)
+
+        # Then
+        assert [block["type"] for block in blocks] == ["numbered_list_item", "numbered_list_item"]
+        nested = blocks[0]["numbered_list_item"]["children"][0]
+        assert plain_text(nested) == "nested"
+        assert plain_text(nested["bulleted_list_item"]["children"][0]) == "deeper"
+
+    #  Given lists nested deeper than the API accepts in one request, the nesting should be kept;
+    #  NotionClient.append_blocks appends the deeper levels in follow-up requests.
+    def test_deep_nesting_is_kept(self):
+        # Given
+        text = "- a\n  - b\n    - c\n      - d\n        - e"
+
+        # When
+        blocks = markdown_to_blocks(text)
+
+        # Then
+        block = blocks[0]
+        for expected in ["b", "c", "d", "e"]:
+            children = block["bulleted_list_item"]["children"]
+            assert [plain_text(child) for child in children] == [expected]
+            block = children[0]
+        assert "children" not in block["bulleted_list_item"]
+
+    #  Given a fenced code block, its content should be kept verbatim with a Notion language.
+    def test_code_block(self):
+        # Given
+        text = "Intro\n```py\nx = -1\n  y = \"a\"\n```"
+
+        # When
+        blocks = markdown_to_blocks(text)
+
+        # Then
+        assert blocks[0]["type"] == "paragraph"
+        assert blocks[1]["code"]["language"] == "python"
+        assert plain_text(blocks[1]) == 'x = -1\n  y = "a"'
+
+    #  Given consecutive text lines, they should be joined into one paragraph, and a blank line should end it.
+    def test_paragraphs(self):
+        # Given
+        text = "first line\nsecond line\n\nnext paragraph"
+
+        # When
+        blocks = markdown_to_blocks(text)
+
+        # Then
+        assert [plain_text(block) for block in blocks] == ["first line second line", "next paragraph"]
+
+    #  Given a heading after a list, the heading should not be attached to the list.
+    def test_heading_closes_list(self):
+        # Given
+        text = "- item\n### Next\ntext"
+
+        # When
+        blocks = markdown_to_blocks(text)
+
+        # Then
+        assert [block["type"] for block in blocks] == ["bulleted_list_item", "heading_3", "paragraph"]
+
+
+class TestToRichText:
+
+    #  Given bold, code and link markup, the rich text should carry the matching annotations.
+    def test_inline_formatting(self):
+        # Given
+        text = "use **bold** and `code` or [docs](https://example.com)"
+
+        # When
+        rich_text = to_rich_text(text)
+
+        # Then
+        assert [item["text"]["content"] for item in rich_text] == ["use ", "bold", " and ", "code", " or ", "docs"]
+        assert rich_text[1]["annotations"] == {"bold": True}
+        assert rich_text[3]["annotations"] == {"code": True}
+        assert rich_text[5]["text"]["link"] == {"url": "https://example.com"}
+
+    #  Given underscores and asterisks inside words, the text should be kept unchanged.
+    def test_markup_inside_words_is_kept(self):
+        # Given
+        text = "Use __init__, snake_case_name and a*b*c"
+
+        # When
+        rich_text = to_rich_text(text)
+
+        # Then
+        assert [item["text"]["content"] for item in rich_text] == [text]
+        assert "annotations" not in rich_text[0]
+
+    #  Given emphasis at word boundaries, it should be annotated.
+    def test_emphasis_at_word_boundaries(self):
+        # Given
+        text = "an *italic* and __bold text__ word"
+
+        # When
+        rich_text = to_rich_text(text)
+
+        # Then
+        assert [item["text"]["content"] for item in rich_text] == ["an ", "italic", " and ", "bold text", " word"]
+        assert rich_text[1]["annotations"] == {"italic": True}
+        assert rich_text[3]["annotations"] == {"bold": True}
+
+    #  Given text longer than the API limit, it should be split into several rich text objects.
+    def test_long_text_is_split(self):
+        # Given
+        text = "a" * (MAX_RICH_TEXT_LENGTH + 1)
+
+        # When
+        rich_text = to_rich_text(text)
+
+        # Then
+        assert [len(item["text"]["content"]) for item in rich_text] == [MAX_RICH_TEXT_LENGTH, 1]
@@ -0,0 +1,175 @@
+import pytest
+
+from summary_tree import (CHUNK_PAGES, LEVEL_CHAPTER, LEVEL_CHUNK, LEVEL_SECTION, MAX_FAN_IN, Section, SummaryNode,
+                          SummaryTree, build_tree)
+
+
+def create_tree(redis_client, calls: list) -> SummaryTree:
+    def summarize_text(text):
+        calls.append(text)
+        return f'S({text})'
+
+    def combine_summaries(summaries):
+        calls.append(summaries)
+        return f'C({"|".join(summaries)})'
+
+    return SummaryTree(redis_client, 'summary_tree:book', summarize_text, combine_summaries)
+
+
+class TestBuildTree:
+
+    #  Given a book outline with chapters and sections, the tree should follow it and fill uncovered pages
+    #  with chunks aligned to CHUNK_PAGES.
+    def test_follows_outline(self):
+        # Given
+        pages = [f'page {idx}' for idx in range(12)]
+        sections = [
+            Section('Chapter 1', 1, 7, [Section('Section 1.1', 2, 7)]),
+            Section('Chapter 2', 7, 12),
+        ]
+
+        # When
+        root = build_tree(pages, sections)
+
+        # Then
+        assert [(node.level, node.start_page, node.end_page) for node in root.children] == [
+            (LEVEL_CHUNK, 0, 1), (LEVEL_CHAPTER, 1, 7), (LEVEL_CHAPTER, 7, 12)]
+        chapter = root.children[1]
+        assert [(node.level, node.start_page, node.end_page) for node in chapter.children] == [
+            (LEVEL_CHUNK, 1, 2), (LEVEL_SECTION, 2, 7)]
+        assert [(node.start_page, node.end_page) for node in chapter.children[1].children] == [(2, 4), (4, 7)]
+
+    #  Given a range, chunks should be clipped to it while keeping the aligned boundaries inside.
+    def test_range_is_clipped(self):
+        # Given
+        pages = [f'page {idx}' for idx in range(3 * CHUNK_PAGES)]
+
+        # When
+        root = build_tree(pages, [], 1, 2 * CHUNK_PAGES + 1)
+
+        # Then
+        assert [(node.start_page, node.end_page) for node in root.children] == [
+            (1, CHUNK_PAGES), (CHUNK_PAGES, 2 * CHUNK_PAGES), (2 * CHUNK_PAGES, 2 * CHUNK_PAGES + 1)]
+
+
+class TestSummaryTree:
+
+    #  Given an already summarized book, summarizing it again should not call the model.
+    def test_cached_book_is_not_summarized_again(self, redis_client):
+        # Given
+        pages = [f'page {idx}' for idx in range(10)]
+        calls = []
+        first = create_tree(redis_client, calls).summarize(build_tree(pages, []))
+        calls.clear()
+
+        # When
+        summary_tree = create_tree(redis_client, calls)
+        second = summary_tree.summarize(build_tree(pages, []))
+
+        # Then
+        assert second == first
+        assert calls == []
+        assert summary_tree.computed_nodes == 0
+
+    #  Given a changed page, only the chunk containing it and its ancestors should be summarized again.
+    def test_only_stale_nodes_are_summarized(self, redis_client):
+        # Given
+        pages = [f'page {idx}' for idx in range(3 * CHUNK_PAGES)]
+        sections = [Section('Chapter 1', 0, CHUNK_PAGES), Section('Chapter 2', CHUNK_PAGES, 3 * CHUNK_PAGES)]
+        calls = []
+        create_tree(redis_client, calls).summarize(build_tree(pages, sections))
+        pages[-1] = 'changed page'
+
+        # When
+        summary_tree = create_tree(redis_client, calls)
+        summary_tree.summarize(build_tree(pages, sections))
+
+        # Then
+        assert summary_tree.computed_nodes == 3
+
+    #  Given an extended range, the chunks of the previous range should be reused.
+    def test_extended_range_reuses_chunks(self, redis_client):
+        # Given
+        pages = [f'page {idx}' for idx in range(3 * CHUNK_PAGES)]
+        calls = []
+        create_tree(redis_client, calls).summarize(build_tree(pages, [], 0, 2 * CHUNK_PAGES))
+        calls.clear()
+
+        # When
+        create_tree(redis_client, calls).summarize(build_tree(pages, [], 0, 3 * CHUNK_PAGES))
+
+        # Then
+        assert calls[0] == '\n'.join(pages[2 * CHUNK_PAGES:])
+        assert len(calls) == 2
+
+    #  Given a book with many chunks, no combine prompt should get more than MAX_FAN_IN summaries.
+    def test_combine_input_is_bounded(self, redis_client):
+        # Given
+        pages = [f'page {idx}' for idx in range(100 * CHUNK_PAGES)]
+        sections = [Section('Chapter 1', 0, 60 * CHUNK_PAGES),
+                    Section('Chapter 2', 60 * CHUNK_PAGES, 100 * CHUNK_PAGES)]
+        calls = []
+
+        # When
+        create_tree(redis_client, calls).summarize(build_tree(pages, sections))
+
+        # Then
+        combine_inputs = [call for call in calls if isinstance(call, list)]
+        assert combine_inputs
+        assert max(len(summaries) for summaries in combine_inputs) <= MAX_FAN_IN
+
+    #  Given a chapter with a single chunk, the chunk summary should be reused without calling the model.
+    def test_single_child_reuses_summary(self, redis_client):
+        # Given
+        pages = [f'page {idx}' for idx in range(2 * CHUNK_PAGES)]
+        sections = [Section('Chapter 1', 0, CHUNK_PAGES), Section('Chapter 2', CHUNK_PAGES, 2 * CHUNK_PAGES)]
+        calls = []
+        summary_tree = create_tree(redis_client, calls)
+        root = build_tree(pages, sections)
+
+        # When
+        summary = summary_tree.summarize(root.children[0])
+
+        # Then
+        assert summary == 'S(' + '\n'.join(pages[:CHUNK_PAGES]) + ')'
+        assert len(calls) == 1
+
+    #  Given a range past the end of the book or an empty range, building the tree should fail.
+    def test_empty_range_is_rejected(self):
+        # Given
+        pages = [f'page {idx}' for idx in range(10)]
+
+        # When / Then
+        for start_page, end_page in [(20, 30), (5, 5), (6, 2)]:
+            with pytest.raises(ValueError):
+                build_tree(pages, [], start_page, end_page)
+
+    #  Given a node without text or children, summarizing it should not call the model.
+    def test_empty_node_is_not_summarized(self, redis_client):
+        # Given
+        calls = []
+
+        # When
+        summary = create_tree(redis_client, calls).summarize(SummaryNode(LEVEL_CHAPTER, '', 0, 0))
+
+        # Then
+        assert summary == ''
+        assert calls == []
+
+    #  Given a range with trimmed edge pages, its chunks should be cached next to the untrimmed book chunks.
+    def test_trimmed_pages_do_not_replace_book_cache(self, redis_client):
+        # Given
+        pages = [f'page {idx}' for idx in range(2 * CHUNK_PAGES)]
+        sections = [Section('Chapter 1', 0, CHUNK_PAGES), Section('Chapter 2', CHUNK_PAGES, 2 * CHUNK_PAGES)]
+        calls = []
+        create_tree(redis_client, calls).summarize(build_tree(pages, sections))
+        create_tree(redis_client, calls).summarize(build_tree(pages, sections, 0, CHUNK_PAGES, {0: 'age 0'}))
+        calls.clear()
+
+        # When
+        summary_tree = create_tree(redis_client, calls)
+        summary_tree.summarize(build_tree(pages, sections))
+
+        # Then
+        assert calls == []
+        assert summary_tree.computed_nodes == 0
@@ -1,28 +1,53 @@
+import hashlib
+import os
+
 import redis
 from langchain_community.document_loaders import pdf
 from langchain_community.vectorstores.faiss import FAISS
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_core.vectorstores import VectorStore
 from langchain_openai import OpenAIEmbeddings
+from pypdf import PdfReader
+
+from summary_tree import Section
+
+_connection_pool = None
+
 
+def create_redis_client() -> redis.Redis:
+    global _connection_pool
+    if _connection_pool is None:
+        _connection_pool = redis.ConnectionPool.from_url(os.environ.get('REDIS_URL', 'redis://localhost:6379'))
+    return redis.Redis(connection_pool=_connection_pool)
+
+
+# embedding_store is imported in the embedding helpers only, so the PDF helpers do not need faiss and zstandard
 
 def is_embedding_in_keys(hashmap_name: str, filename: str, redis_client: redis.Redis) -> bool:
-    if hashmap_name.encode() not in redis_client.keys("*"):
-        return False
+    from embedding_store import has_vector_store
 
-    result = filename.encode() in redis_client.hkeys(hashmap_name)
+    result = has_vector_store(redis_client, hashmap_name, filename)
 
     if result:
         print(f'Found embedding {filename} in {hashmap_name} embedding store')
     return result
 
 
-def get_embeddings(hashmap_name: str, filename: str, redis_client: redis.Redis) -> bytes:
-    return redis_client.hget(hashmap_name, filename)
+def get_embeddings(hashmap_name: str, filename: str, redis_client: redis.Redis, embeddings: Embeddings) -> FAISS:
+    from embedding_store import load_vector_store
+
+    return load_vector_store(redis_client, hashmap_name, filename, embeddings)
 
 
-def save_embeddings(hashmap_name: str, filename: str, redis_client: redis.Redis, data: bytes) -> None:
-    redis_client.hset(hashmap_name, filename, data)
+def save_embeddings(hashmap_name: str, filename: str, redis_client: redis.Redis, data: FAISS,
+                    encoding: str = None) -> None:
+    """
+    :param encoding: One of embedding_store.VECTOR_ENCODINGS, embedding_store.DEFAULT_VECTOR_ENCODING when None
+    """
+    from embedding_store import DEFAULT_VECTOR_ENCODING, save_vector_store
+
+    save_vector_store(redis_client, hashmap_name, filename, data, encoding or DEFAULT_VECTOR_ENCODING)
 
 
 def get_pages_from_pdf(filename: str, start_page: int, end_page: int) -> list[Document]:
@@ -32,22 +57,62 @@ def get_pages_from_pdf(filename: str, start_page: int, end_page: int) -> list[Do
     return loader.load_and_split()[start_page:end_page]
 
 
+def get_book_pages(filename: str) -> list[Document]:
+    loader = pdf.PyPDFLoader(
+        file_path=filename
+    )
+    return loader.load()
+
+
+def get_book_outline(filename: str) -> list[Section]:
+    reader = PdfReader(filename)
+    return _outline_to_sections(reader, reader.outline, len(reader.pages))
+
+
+def _outline_to_sections(reader: PdfReader, outline: list, end_page: int) -> list[Section]:
+    entries = []
+    for item in outline:
+        if isinstance(item, list):
+            if entries:
+                entries[-1][2] = item
+            continue
+
+        start_page = reader.get_destination_page_number(item)
+        if start_page is not None and start_page >= 0:
+            entries.append([item.title, start_page, []])
+
+    entries.sort(key=lambda entry: entry[1])
+
+    sections = []
+    for idx, (title, start_page, children) in enumerate(entries):
+        section_end = entries[idx + 1][1] if idx + 1 < len(entries) else end_page
+        sections.append(Section(title, start_page, section_end, _outline_to_sections(reader, children, section_end)))
+    return sections
+
+
+def get_file_hash(filename: str) -> str:
+    digest = hashlib.sha256()
+    with open(filename, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
 def make_vectors(filename: str, start_page: int, end_page: int, redis_client: redis.Redis,
-                 hashmap_name: str) -> VectorStore:
+                 hashmap_name: str, encoding: str = None) -> VectorStore:
     final_filename = f'{filename}_{start_page}_{end_page}'
-    if is_embedding_in_keys(hashmap_name, final_filename, redis_client):
-        return FAISS.deserialize_from_bytes(
-            serialized=get_embeddings(hashmap_name, filename, redis_client),
-            embeddings=OpenAIEmbeddings()
-        )
     embeddings = OpenAIEmbeddings()
 
+    if is_embedding_in_keys(hashmap_name, final_filename, redis_client):
+        result = get_embeddings(hashmap_name, final_filename, redis_client, embeddings)
+        if result is not None:
+            return result
+
     pages = get_pages_from_pdf(filename, start_page, end_page)
 
     result = FAISS.from_documents(pages, embeddings)
 
-    to_save = result.serialize_to_bytes()
-    save_embeddings(hashmap_name, final_filename, redis_client, to_save)
+    save_embeddings(hashmap_name, final_filename, redis_client, result, encoding)
 
     return result
 